@@ -12,10 +12,17 @@ from kivy.uix.button import Button
 from kivy.uix.label import Label
 from kivy.uix.textinput import TextInput
 from kivy.uix.scrollview import ScrollView
-from kivy.core.text import LabelBase
+from kivy.uix.widget import Widget
+from kivy.core.text import LabelBase, Label as CoreLabel
+from kivy.graphics import Color, Rectangle
+from kivy.properties import StringProperty, NumericProperty
 from kivy.clock import Clock
 import json
 import os
+import re
+import threading
+from bisect import bisect_left, bisect_right, insort
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import platform
 
@@ -46,6 +53,459 @@ def setup_chinese_font():
 # 初始化字体
 setup_chinese_font()
 
+class ComputeScheduler:
+    """后台计算调度器
+
+    同一个key只保留最新提交的任务，旧任务会被取消或丢弃结果，
+    结果通过Clock.schedule_once回到主线程。
+    """
+
+    def __init__(self, max_workers=2):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.lock = threading.Lock()
+        self.generations = {}
+        self.futures = {}
+
+    def submit(self, key, func, *args, callback=None, error_callback=None):
+        """提交任务，取代同一key下尚未完成的任务"""
+        with self.lock:
+            generation = self.generations.get(key, 0) + 1
+            self.generations[key] = generation
+            old_future = self.futures.pop(key, None)
+            if old_future is not None:
+                old_future.cancel()
+            future = self.executor.submit(func, *args)
+            self.futures[key] = future
+        future.add_done_callback(
+            lambda f: self._on_done(key, generation, f, callback, error_callback)
+        )
+        return future
+
+    def cancel(self, key):
+        """取消某个key下的任务，已在运行的任务结果将被丢弃"""
+        with self.lock:
+            self.generations[key] = self.generations.get(key, 0) + 1
+            future = self.futures.pop(key, None)
+        if future is not None:
+            future.cancel()
+
+    def is_pending(self, key):
+        """某个key下是否有尚未交付的任务"""
+        with self.lock:
+            return key in self.futures
+
+    def is_current(self, key, generation):
+        """判断任务是否仍是该key下最新的任务"""
+        with self.lock:
+            return self.generations.get(key) == generation
+
+    def _on_done(self, key, generation, future, callback, error_callback):
+        """工作线程完成后，把结果转交主线程"""
+        if future.cancelled() or not self.is_current(key, generation):
+            return
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"后台任务失败: {key}, 错误: {e}")
+            # except块结束后e会被删除，需要绑定到新的名字
+            error = e
+            Clock.schedule_once(
+                lambda dt, error=error: self._deliver(key, generation, error_callback, error)
+            )
+            return
+        Clock.schedule_once(
+            lambda dt, result=result: self._deliver(key, generation, callback, result)
+        )
+
+    def _deliver(self, key, generation, callback, value):
+        """在主线程上交付结果，过期结果直接丢弃"""
+        with self.lock:
+            if self.generations.get(key) != generation:
+                return
+            self.futures.pop(key, None)
+        if callback:
+            callback(value)
+
+    def shutdown(self):
+        """关闭调度器，取消所有等待中的任务"""
+        with self.lock:
+            futures = list(self.futures.values())
+            self.futures.clear()
+            self.generations.clear()
+        for future in futures:
+            future.cancel()
+        self.executor.shutdown(wait=False)
+
+def run_in_background(key, func, *args, callback=None, error_callback=None):
+    """把计算提交到应用的调度器，没有调度器时直接同步执行"""
+    app = App.get_running_app()
+    scheduler = getattr(app, 'scheduler', None)
+    if scheduler is None:
+        try:
+            result = func(*args)
+        except Exception as e:
+            if error_callback:
+                error_callback(e)
+            return
+        if callback:
+            callback(result)
+        return
+    scheduler.submit(key, func, *args, callback=callback, error_callback=error_callback)
+
+def background_pending(key):
+    """应用调度器中某个key下是否有未完成的任务"""
+    scheduler = getattr(App.get_running_app(), 'scheduler', None)
+    return scheduler is not None and scheduler.is_pending(key)
+
+def cancel_background(key):
+    """取消应用调度器中某个key下的任务"""
+    app = App.get_running_app()
+    scheduler = getattr(app, 'scheduler', None)
+    if scheduler is not None:
+        scheduler.cancel(key)
+
+def compute_contract(open_price, current_price, leverage, principal):
+    """计算合约涨跌幅和盈亏"""
+    # 计算涨跌幅
+    percent_change = ((current_price - open_price) / open_price) * 100
+    reverse_change = -percent_change
+    
+    # 计算盈亏
+    profit_loss = principal * (percent_change / 100) * leverage
+    total = principal + profit_loss
+    return percent_change, reverse_change, profit_loss, total
+
+def evaluate_expression(calc_input):
+    """计算表达式结果"""
+    # 替换显示符号为Python计算符号
+    calc_string = calc_input.replace('×', '*').replace('÷', '/')
+    return eval(calc_string)
+
+def compute_compound_totals(records):
+    """根据记录列表重新计算每条记录的前后总额"""
+    compound_total = 0
+    totals = []
+    for record in records:
+        if record.get('reset'):
+            compound_total = record['total_after']
+        else:
+            compound_total += record['profit']
+        totals.append((compound_total - record.get('profit', 0), compound_total))
+    return compound_total, totals
+
+# 搜索结果最多显示条数
+SEARCH_LIMIT = 50
+# 文本搜索每次最多检查的候选记录数
+SEARCH_SCAN_LIMIT = 5000
+
+NUMBER_PATTERN = re.compile(r'\d+(?:\.\d*)?|\.\d+')
+RANGE_PATTERN = re.compile(r'^(>=|<=|>|<|=)\s*(-?[\d.]+)$')
+BETWEEN_PATTERN = re.compile(r'^(-?[\d.]+)\s*~\s*(-?[\d.]+)$')
+DATE_PATTERN = re.compile(r'^(\d{1,2})/(\d{1,2})(?:\s*~\s*(\d{1,2})/(\d{1,2}))?$')
+
+def tokenize(text):
+    """提取文本中的数字作为检索词"""
+    return NUMBER_PATTERN.findall(text)
+
+class TokenIndex:
+    """检索词倒排索引，支持前缀查询"""
+    
+    def __init__(self):
+        self.postings = {}
+        self.sorted_tokens = []
+    
+    def add(self, key, tokens):
+        """添加记录的检索词"""
+        for token in tokens:
+            keys = self.postings.get(token)
+            if keys is None:
+                keys = self.postings[token] = set()
+                insort(self.sorted_tokens, token)
+            keys.add(key)
+    
+    def remove(self, key, tokens):
+        """删除记录的检索词"""
+        for token in tokens:
+            keys = self.postings.get(token)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if not keys:
+                del self.postings[token]
+                i = bisect_left(self.sorted_tokens, token)
+                if i < len(self.sorted_tokens) and self.sorted_tokens[i] == token:
+                    del self.sorted_tokens[i]
+    
+    def build(self, entries):
+        """批量建立索引，entries为(key, tokens)列表"""
+        self.postings = {}
+        for key, tokens in entries:
+            for token in tokens:
+                self.postings.setdefault(token, set()).add(key)
+        self.sorted_tokens = sorted(self.postings)
+    
+    def exact(self, token):
+        """精确匹配检索词"""
+        return self.postings.get(token, set())
+    
+    def prefix(self, prefix, max_keys):
+        """前缀匹配检索词，匹配的记录超过max_keys时返回None"""
+        start = bisect_left(self.sorted_tokens, prefix)
+        end = bisect_left(self.sorted_tokens, prefix + '\uffff')
+        # 每个检索词至少对应一条记录，检索词太多时不用再逐个统计
+        if end - start > max_keys:
+            return None
+        posting_sets = [self.postings[token] for token in self.sorted_tokens[start:end]]
+        if sum(len(keys) for keys in posting_sets) > max_keys:
+            return None
+        return set().union(*posting_sets)
+
+class SortedIndex:
+    """有序值索引，支持范围查询"""
+    
+    def __init__(self):
+        self.items = []
+    
+    def add(self, key, value):
+        """添加记录的值"""
+        insort(self.items, (value, key))
+    
+    def build(self, items):
+        """批量建立索引，items为(value, key)列表"""
+        self.items = sorted(items)
+    
+    def remove(self, key, value):
+        """删除记录的值"""
+        i = bisect_left(self.items, (value, key))
+        if i < len(self.items) and self.items[i] == (value, key):
+            del self.items[i]
+    
+    def bounds(self, low=None, high=None, include_low=True, include_high=True):
+        """返回范围内的起止位置"""
+        if low is None:
+            start = 0
+        elif include_low:
+            start = bisect_left(self.items, (low,))
+        else:
+            start = bisect_right(self.items, (low, float('inf')))
+        if high is None:
+            end = len(self.items)
+        elif include_high:
+            end = bisect_right(self.items, (high, float('inf')))
+        else:
+            end = bisect_left(self.items, (high,))
+        return start, max(start, end)
+
+class HistoryIndex:
+    """历史记录检索索引，随记录增删增量更新"""
+    
+    def __init__(self, text_of=None, fields=None):
+        self.text_of = text_of
+        self.fields = fields or {}
+        self.clear()
+    
+    def clear(self):
+        """清空索引"""
+        self.next_key = 0
+        self.records = {}
+        self.keys = {}
+        self.indexed = {}
+        self.tokens = TokenIndex()
+        self.sorted = {name: SortedIndex() for name in self.fields}
+    
+    def rebuild(self, records):
+        """根据记录列表重建索引，批量排序而不是逐条插入"""
+        self.clear()
+        for record in records:
+            self.register(record)
+        self.tokens.build((key, tokens) for key, (tokens, values) in self.indexed.items())
+        for name, index in self.sorted.items():
+            index.build(
+                (values[name], key)
+                for key, (tokens, values) in self.indexed.items()
+                if name in values
+            )
+    
+    def register(self, record):
+        """为记录分配key并提取检索词和字段值"""
+        key = self.next_key
+        self.next_key += 1
+        self.records[key] = record
+        self.keys[id(record)] = key
+        
+        tokens = tokenize(self.text_of(record)) if self.text_of else []
+        values = {}
+        for name, value_of in self.fields.items():
+            value = value_of(record)
+            if value is not None:
+                values[name] = value
+        self.indexed[key] = (tokens, values)
+        return key
+    
+    def add(self, record):
+        """添加记录"""
+        key = self.register(record)
+        tokens, values = self.indexed[key]
+        self.tokens.add(key, tokens)
+        for name, value in values.items():
+            self.sorted[name].add(key, value)
+    
+    def remove(self, record):
+        """删除记录"""
+        key = self.keys.pop(id(record), None)
+        if key is None:
+            return
+        del self.records[key]
+        tokens, values = self.indexed.pop(key)
+        self.tokens.remove(key, tokens)
+        for name, value in values.items():
+            self.sorted[name].remove(key, value)
+    
+    def search_text(self, query, limit=SEARCH_LIMIT):
+        """按表达式文本检索，最新的记录在前
+
+        查询中后面还跟着运算符的数字必须完整出现，结尾的数字按前缀匹配，
+        且查询文本要从数字边界开始出现在记录中。每次最多检查
+        SEARCH_SCAN_LIMIT 条候选记录，保证输入时的响应速度。
+        """
+        if not self.text_of:
+            return []
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        
+        # 查询以数字结尾时，这个数字可能还没输入完
+        if query.endswith(tokens[-1]):
+            exact_tokens, prefix = tokens[:-1], tokens[-1]
+        else:
+            exact_tokens, prefix = tokens, None
+        
+        candidate_sets = [self.tokens.exact(token) for token in exact_tokens]
+        if prefix is not None:
+            # 前缀匹配的记录太多时不合并，由其他条件或直接扫描处理
+            prefix_keys = self.tokens.prefix(prefix, SEARCH_SCAN_LIMIT)
+            if prefix_keys is not None:
+                candidate_sets.append(prefix_keys)
+        
+        if not candidate_sets:
+            keys = reversed(self.records)
+        else:
+            candidate_sets.sort(key=len)
+            candidates = candidate_sets[0]
+            if len(candidate_sets) > 1:
+                candidates = candidates.intersection(*candidate_sets[1:])
+            if len(candidates) > len(self.records) // 4:
+                # 候选很密集时，从最新记录往前找比整体排序快
+                keys = (key for key in reversed(self.records) if key in candidates)
+            else:
+                keys = sorted(candidates, reverse=True)
+        
+        # 查询以数字开头时，不能从记录中某个数字的中间开始匹配
+        if query[0].isdigit() or query[0] == '.':
+            pattern = re.compile(r'(?<![\d.])' + re.escape(query))
+        else:
+            pattern = re.compile(re.escape(query))
+        
+        results = []
+        for checked, key in enumerate(keys):
+            if checked >= SEARCH_SCAN_LIMIT:
+                break
+            if pattern.search(self.text_of(self.records[key])):
+                results.append(self.records[key])
+                if len(results) >= limit:
+                    break
+        return results
+    
+    def search_range(self, name, low=None, high=None, include_low=True, include_high=True, limit=SEARCH_LIMIT):
+        """按数值范围检索，值大的记录在前"""
+        index = self.sorted[name]
+        start, end = index.bounds(low, high, include_low, include_high)
+        items = index.items[max(start, end - limit):end]
+        return [self.records[key] for value, key in reversed(items)]
+
+def parse_range_query(query):
+    """解析数值范围查询，如 >500、<=10、=3、100~200"""
+    try:
+        match = RANGE_PATTERN.match(query)
+        if match:
+            op, value = match.group(1), float(match.group(2))
+            if op == '>':
+                return value, None, False, True
+            if op == '>=':
+                return value, None, True, True
+            if op == '<':
+                return None, value, True, False
+            if op == '<=':
+                return None, value, True, True
+            return value, value, True, True
+        match = BETWEEN_PATTERN.match(query)
+        if match:
+            low, high = sorted([float(match.group(1)), float(match.group(2))])
+            return low, high, True, True
+    except ValueError:
+        pass
+    return None
+
+def parse_date_query(query):
+    """解析日期查询，如 10/19、10/01~10/19，返回日期范围列表，较晚的范围在前
+
+    记录日期不含年份，跨年范围如 12/25~01/05 拆成 01/01~01/05 和 12/25~12/31。
+    """
+    match = DATE_PATTERN.match(query)
+    if not match:
+        return None
+    low = f"{int(match.group(1)):02d}/{int(match.group(2)):02d}"
+    high = low
+    if match.group(3):
+        high = f"{int(match.group(3)):02d}/{int(match.group(4)):02d}"
+    if low > high:
+        return [('01/01', high), (low, '12/31')]
+    return [(low, high)]
+
+def normalize_expression_query(query):
+    """把键盘输入的运算符转换为显示符号，空白按记录格式处理"""
+    query = ''.join(query.split())
+    query = query.replace('*', '×').replace('x', '×').replace('/', '÷')
+    # 记录中只有箭头两侧带空格
+    return query.replace('→', ' → ')
+
+def calc_record_value(record):
+    """提取计算器记录的结果数值"""
+    if " → " in record:
+        value = record.split(" → ")[1]
+    elif "存储: " in record:
+        value = record.replace("存储: ", "")
+    else:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+def compound_profit_value(record):
+    """提取复利记录的收益，重置记录不参与收益检索"""
+    if record.get('reset'):
+        return None
+    return record['profit']
+
+def compound_date_value(record):
+    """提取复利记录的日期"""
+    return record['date']
+
+def create_calc_index():
+    """创建计算器存储记录索引"""
+    return HistoryIndex(text_of=lambda record: record, fields={'result': calc_record_value})
+
+def create_compound_index():
+    """创建复利记录索引"""
+    return HistoryIndex(fields={'profit': compound_profit_value, 'date': compound_date_value})
+
+def build_index(create_index, records):
+    """批量建立索引，供后台线程调用"""
+    index = create_index()
+    index.rebuild(records)
+    return index
+
 class ChineseLabel(Label):
     """支持中文的Label"""
     def __init__(self, **kwargs):
@@ -58,6 +518,54 @@ class ChineseButton(Button):
         super().__init__(**kwargs)
         self.font_name = FONT_NAME
 
+class GlyphCache:
+    """字形纹理缓存，每个字符在每种字号下只渲染一次"""
+    
+    def __init__(self):
+        self.textures = {}
+    
+    def get(self, char, font_size):
+        """获取字符纹理，未缓存时渲染"""
+        key = (char, font_size)
+        texture = self.textures.get(key)
+        if texture is None:
+            core_label = CoreLabel(text=char, font_name=FONT_NAME, font_size=font_size)
+            core_label.refresh()
+            texture = core_label.texture
+            self.textures[key] = texture
+        return texture
+
+glyph_cache = GlyphCache()
+
+class GlyphLabel(Widget):
+    """用缓存字形拼接显示的数值标签，适合频繁更新的数字"""
+    text = StringProperty('')
+    font_size = NumericProperty(14)
+    
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # 同一帧内的多次变化只重绘一次
+        self.trigger_redraw = Clock.create_trigger(self.redraw)
+        self.bind(text=self.trigger_redraw, font_size=self.trigger_redraw,
+                  pos=self.trigger_redraw, size=self.trigger_redraw)
+        self.redraw()
+    
+    def redraw(self, *args):
+        """用缓存的字形纹理重新拼接文本"""
+        textures = [glyph_cache.get(char, self.font_size) for char in self.text]
+        x = self.center_x - sum(texture.width for texture in textures) / 2
+        
+        self.canvas.clear()
+        with self.canvas:
+            Color(1, 1, 1, 1)
+            for texture in textures:
+                Rectangle(
+                    texture=texture,
+                    size=texture.size,
+                    pos=(int(x), int(self.center_y - texture.height / 2))
+                )
+                x += texture.width
+
 class ContractScreen(Screen):
     """合约计算器主界面"""
     
@@ -137,7 +645,7 @@ class ContractScreen(Screen):
         # 结果显示区域
         result_layout = BoxLayout(orientation='vertical', spacing=10)
         
-        self.percent_change_label = ChineseLabel(
+        self.percent_change_label = GlyphLabel(
             text='📊 现货涨幅: 0.00%',
             font_size=14,
             size_hint_y=None,
@@ -145,7 +653,7 @@ class ContractScreen(Screen):
         )
         result_layout.add_widget(self.percent_change_label)
         
-        self.reverse_change_label = ChineseLabel(
+        self.reverse_change_label = GlyphLabel(
             text='📉 现货跌幅: 0.00%',
             font_size=14,
             size_hint_y=None,
@@ -153,7 +661,7 @@ class ContractScreen(Screen):
         )
         result_layout.add_widget(self.reverse_change_label)
         
-        self.profit_loss_label = ChineseLabel(
+        self.profit_loss_label = GlyphLabel(
             text='💸 盈亏: ¥0.00',
             font_size=16,
             size_hint_y=None,
@@ -161,7 +669,7 @@ class ContractScreen(Screen):
         )
         result_layout.add_widget(self.profit_loss_label)
         
-        self.total_label = ChineseLabel(
+        self.total_label = GlyphLabel(
             text='💰 总计: ¥0.00',
             font_size=16,
             size_hint_y=None,
@@ -197,23 +705,24 @@ class ContractScreen(Screen):
             if open_price <= 0 or current_price <= 0:
                 return
             
-            # 计算涨跌幅
-            percent_change = ((current_price - open_price) / open_price) * 100
-            reverse_change = -percent_change
-            
-            # 计算盈亏
-            profit_loss = principal * (percent_change / 100) * leverage
-            total = principal + profit_loss
-            
-            # 更新显示
-            self.percent_change_label.text = f'📊 现货涨幅: {percent_change:.2f}%'
-            self.reverse_change_label.text = f'📉 现货跌幅: {reverse_change:.2f}%'
-            self.profit_loss_label.text = f'💸 盈亏: ¥{profit_loss:.2f}'
-            self.total_label.text = f'💰 总计: ¥{total:.2f}'
+            run_in_background(
+                'contract',
+                compute_contract,
+                open_price, current_price, leverage, principal,
+                callback=self.show_result
+            )
             
         except ValueError:
             pass
     
+    def show_result(self, result):
+        """更新计算结果显示"""
+        percent_change, reverse_change, profit_loss, total = result
+        self.percent_change_label.text = f'📊 现货涨幅: {percent_change:.2f}%'
+        self.reverse_change_label.text = f'📉 现货跌幅: {reverse_change:.2f}%'
+        self.profit_loss_label.text = f'💸 盈亏: ¥{profit_loss:.2f}'
+        self.total_label.text = f'💰 总计: ¥{total:.2f}'
+    
     def goto_calculator(self, *args):
         """跳转到计算器"""
         self.manager.current = 'calculator'
@@ -230,7 +739,9 @@ class CalculatorScreen(Screen):
         self.name = 'calculator'
         self.calc_input = ""
         self.calc_storage = []
+        self.calc_index = create_calc_index()
         self.calc_just_calculated = False
+        self.calc_store_pending = False
         self.calc_data_file = None
         self.build_ui()
         self.load_calc_storage()
@@ -292,6 +803,18 @@ class CalculatorScreen(Screen):
         )
         main_layout.add_widget(storage_label)
         
+        # 搜索框
+        self.calc_search_input = TextInput(
+            text='',
+            hint_text='🔍 搜索: 3.5×20 或 >500 或 100~200',
+            multiline=False,
+            size_hint_y=None,
+            height=40,
+            font_name=FONT_NAME
+        )
+        self.calc_search_input.bind(text=lambda instance, value: self.update_calc_storage_display())
+        main_layout.add_widget(self.calc_search_input)
+        
         # 存储记录列表
         scroll = ScrollView(size_hint_y=0.3)
         self.calc_storage_layout = BoxLayout(orientation='vertical', size_hint_y=None)
@@ -303,6 +826,11 @@ class CalculatorScreen(Screen):
     
     def calc_button_click(self, button_text):
         """处理计算器按钮点击"""
+        # 输入变化后，正在进行的计算结果已过期
+        if button_text not in ['存储', '清除存储']:
+            cancel_background('calc_eval')
+            self.calc_store_pending = False
+        
         if button_text in '0123456789.':
             if self.calc_just_calculated:
                 self.calc_input = button_text
@@ -320,24 +848,14 @@ class CalculatorScreen(Screen):
         
         elif button_text == '=':
             if self.calc_input:
-                try:
-                    # 替换显示符号为Python计算符号
-                    calc_string = self.calc_input.replace('×', '*').replace('÷', '/')
-                    result = eval(calc_string)
-                    
-                    # 存储记录
-                    record = f"{self.calc_input} → {result}"
-                    if record not in self.calc_storage:
-                        self.calc_storage.append(record)
-                        self.save_calc_storage()
-                        self.update_calc_storage_display()
-                    
-                    self.calc_input = str(result)
-                    self.calc_just_calculated = True
-                    
-                except Exception:
-                    self.calc_input = "错误"
-                    self.calc_just_calculated = True
+                expression = self.calc_input
+                run_in_background(
+                    'calc_eval',
+                    evaluate_expression,
+                    expression,
+                    callback=lambda result: self.apply_calc_result(expression, result),
+                    error_callback=lambda e: self.apply_calc_error()
+                )
         
         elif button_text == '清空':
             self.calc_input = '0'
@@ -351,26 +869,71 @@ class CalculatorScreen(Screen):
                 self.calc_input = '0'
         
         elif button_text == '存储':
-            if self.calc_input and self.calc_input != '0':
-                record = f"存储: {self.calc_input}"
-                if record not in self.calc_storage:
-                    self.calc_storage.append(record)
-                    self.save_calc_storage()
-                    self.update_calc_storage_display()
+            if background_pending('calc_eval'):
+                # 等计算结果返回后再存储
+                self.calc_store_pending = True
+            else:
+                self.store_calc_input()
         
         elif button_text == '清除存储':
             self.calc_storage.clear()
+            cancel_background('calc_index')
+            self.calc_index.clear()
             self.save_calc_storage()
             self.update_calc_storage_display()
         
         # 更新显示
         self.calc_display.text = self.calc_input if self.calc_input else '0'
     
+    def apply_calc_result(self, expression, result):
+        """应用表达式计算结果"""
+        # 存储记录
+        record = f"{expression} → {result}"
+        if record not in self.calc_storage:
+            self.calc_storage.append(record)
+            self.index_calc_record(record)
+            self.save_calc_storage()
+            self.update_calc_storage_display()
+        
+        self.calc_input = str(result)
+        self.calc_just_calculated = True
+        self.calc_display.text = self.calc_input
+        self.store_if_pending()
+    
+    def apply_calc_error(self):
+        """表达式计算出错"""
+        self.calc_input = "错误"
+        self.calc_just_calculated = True
+        self.calc_display.text = self.calc_input
+        self.store_if_pending()
+    
+    def store_if_pending(self):
+        """执行计算期间按下的存储"""
+        if self.calc_store_pending:
+            self.calc_store_pending = False
+            self.store_calc_input()
+    
+    def store_calc_input(self):
+        """存储当前输入"""
+        if self.calc_input and self.calc_input != '0':
+            record = f"存储: {self.calc_input}"
+            if record not in self.calc_storage:
+                self.calc_storage.append(record)
+                self.index_calc_record(record)
+                self.save_calc_storage()
+                self.update_calc_storage_display()
+    
     def update_calc_storage_display(self):
         """更新存储记录显示"""
         self.calc_storage_layout.clear_widgets()
         
-        for i, record in enumerate(reversed(self.calc_storage[-10:])):  # 显示最近10条
+        query = self.calc_search_input.text.strip()
+        if query:
+            records = self.search_calc_storage(query)
+        else:
+            records = reversed(self.calc_storage[-10:])  # 显示最近10条
+        
+        for record in records:
             record_layout = BoxLayout(size_hint_y=None, height=30, spacing=5)
             
             record_label = ChineseLabel(
@@ -390,6 +953,34 @@ class CalculatorScreen(Screen):
             
             self.calc_storage_layout.add_widget(record_layout)
     
+    def index_calc_record(self, record):
+        """把新记录加入索引，后台重建未完成时用最新记录重新提交"""
+        self.calc_index.add(record)
+        if background_pending('calc_index'):
+            self.rebuild_calc_index()
+    
+    def rebuild_calc_index(self):
+        """在后台重建检索索引，完成后替换当前索引"""
+        run_in_background(
+            'calc_index',
+            build_index,
+            create_calc_index, list(self.calc_storage),
+            callback=self.apply_calc_index
+        )
+    
+    def apply_calc_index(self, index):
+        """替换为重建好的索引"""
+        self.calc_index = index
+        if self.calc_search_input.text.strip():
+            self.update_calc_storage_display()
+    
+    def search_calc_storage(self, query):
+        """检索存储记录，数值范围按结果检索，其余按表达式检索"""
+        range_query = parse_range_query(query)
+        if range_query:
+            return self.calc_index.search_range('result', *range_query)
+        return self.calc_index.search_text(normalize_expression_query(query))
+    
     def copy_to_calc_display(self, record):
         """复制记录到显示屏"""
         if " → " in record:
@@ -409,10 +1000,13 @@ class CalculatorScreen(Screen):
             try:
                 with open(self.calc_data_file, 'r', encoding='utf-8') as f:
                     self.calc_storage = json.load(f)
+                self.rebuild_calc_index()
                 self.update_calc_storage_display()
             except Exception as e:
                 print(f"加载计算器数据失败: {e}")
                 self.calc_storage = []
+                cancel_background('calc_index')
+                self.calc_index.clear()
     
     def save_calc_storage(self):
         """保存计算器存储记录"""
@@ -435,6 +1029,7 @@ class CompoundScreen(Screen):
         super().__init__(**kwargs)
         self.name = 'compound'
         self.compound_records = []
+        self.compound_index = create_compound_index()
         self.compound_total = 0
         self.data_file = None
         self.build_ui()
@@ -493,7 +1088,7 @@ class CompoundScreen(Screen):
         main_layout.add_widget(btn_layout)
         
         # 总计显示
-        self.total_label = ChineseLabel(
+        self.total_label = GlyphLabel(
             text=f'💰 当前总计: ¥{self.compound_total:.2f}',
             font_size=16,
             size_hint_y=None,
@@ -510,6 +1105,18 @@ class CompoundScreen(Screen):
         )
         main_layout.add_widget(history_label)
         
+        # 搜索框
+        self.history_search_input = TextInput(
+            text='',
+            hint_text='🔍 搜索收益: >500 或 100~200，日期(不分年份): 10/19 或 12/25~01/05',
+            multiline=False,
+            size_hint_y=None,
+            height=40,
+            font_name=FONT_NAME
+        )
+        self.history_search_input.bind(text=lambda instance, value: self.update_history_display())
+        main_layout.add_widget(self.history_search_input)
+        
         # 历史记录列表
         scroll = ScrollView()
         self.history_layout = BoxLayout(orientation='vertical', size_hint_y=None)
@@ -535,12 +1142,15 @@ class CompoundScreen(Screen):
                 }
                 
                 self.compound_records.append(record)
+                self.compound_index.add(record)
+                self.refresh_index_if_rebuilding()
                 self.compound_total += profit
                 
                 self.profit_input.text = ''
                 self.update_total_display()
                 self.update_history_display()
                 self.save_data()
+                self.refresh_if_recalculating()
                 
         except ValueError:
             pass
@@ -561,12 +1171,15 @@ class CompoundScreen(Screen):
                 }
                 
                 self.compound_records.append(record)
+                self.compound_index.add(record)
+                self.refresh_index_if_rebuilding()
                 self.compound_total = new_principal
                 
                 self.reset_input.text = ''
                 self.update_total_display()
                 self.update_history_display()
                 self.save_data()
+                self.refresh_if_recalculating()
                 
         except ValueError:
             pass
@@ -579,7 +1192,13 @@ class CompoundScreen(Screen):
         """更新历史记录显示"""
         self.history_layout.clear_widgets()
         
-        for i, record in enumerate(reversed(self.compound_records[-20:])):  # 显示最近20条
+        query = self.history_search_input.text.strip()
+        if query:
+            records = self.search_history(query)
+        else:
+            records = reversed(self.compound_records[-20:])  # 显示最近20条
+        
+        for record in records:
             record_layout = BoxLayout(size_hint_y=None, height=40, spacing=5)
             
             if record.get('reset'):
@@ -600,7 +1219,7 @@ class CompoundScreen(Screen):
                 size_hint_x=0.2,
                 font_size=10
             )
-            edit_btn.bind(on_press=lambda x, idx=len(self.compound_records)-1-i: self.edit_record(idx))
+            edit_btn.bind(on_press=lambda x, r=record: self.edit_record(self.index_of_record(r)))
             record_layout.add_widget(edit_btn)
             
             delete_btn = ChineseButton(
@@ -608,11 +1227,31 @@ class CompoundScreen(Screen):
                 size_hint_x=0.2,
                 font_size=10
             )
-            delete_btn.bind(on_press=lambda x, idx=len(self.compound_records)-1-i: self.delete_record(idx))
+            delete_btn.bind(on_press=lambda x, r=record: self.delete_record(self.index_of_record(r)))
             record_layout.add_widget(delete_btn)
             
             self.history_layout.add_widget(record_layout)
     
+    def search_history(self, query):
+        """检索收益历史，支持日期和收益范围"""
+        date_ranges = parse_date_query(query)
+        if date_ranges:
+            records = []
+            for low, high in date_ranges:
+                records.extend(self.compound_index.search_range('date', low, high))
+            return records[:SEARCH_LIMIT]
+        range_query = parse_range_query(query)
+        if range_query:
+            return self.compound_index.search_range('profit', *range_query)
+        return []
+    
+    def index_of_record(self, record):
+        """查找记录在列表中的位置，从最新的记录开始查找"""
+        for i in range(len(self.compound_records) - 1, -1, -1):
+            if self.compound_records[i] is record:
+                return i
+        return -1
+    
     def edit_record(self, index):
         """编辑记录"""
         if 0 <= index < len(self.compound_records):
@@ -623,23 +1262,65 @@ class CompoundScreen(Screen):
     def delete_record(self, index):
         """删除记录"""
         if 0 <= index < len(self.compound_records):
-            self.compound_records.pop(index)
-            self.recalculate_compound_total()
-            self.update_total_display()
+            record = self.compound_records.pop(index)
+            self.compound_index.remove(record)
+            self.refresh_index_if_rebuilding()
             self.update_history_display()
+            # 先保存删除结果，避免退出时重算未完成导致记录恢复，
+            # 此时的总额由下次加载时的重算修正
             self.save_data()
+            self.recalculate_compound_total()
     
     def recalculate_compound_total(self):
-        """重新计算复利总额"""
-        self.compound_total = 0
-        for i, record in enumerate(self.compound_records):
-            if record.get('reset'):
-                self.compound_total = record['total_after']
-            else:
-                self.compound_total += record['profit']
-            # 更新记录中的总额
-            record['total_before'] = self.compound_total - record.get('profit', 0)
-            record['total_after'] = self.compound_total
+        """在后台重新计算复利总额，只应用最新一次的结果"""
+        records = list(self.compound_records)
+        run_in_background(
+            'compound_recalc',
+            compute_compound_totals,
+            records,
+            callback=lambda result: self.apply_compound_totals(records, result)
+        )
+    
+    def rebuild_compound_index(self):
+        """在后台重建检索索引，完成后替换当前索引"""
+        run_in_background(
+            'compound_index',
+            build_index,
+            create_compound_index, list(self.compound_records),
+            callback=self.apply_compound_index
+        )
+    
+    def refresh_index_if_rebuilding(self):
+        """记录变化时如有未完成的索引重建，用最新记录重新提交"""
+        if background_pending('compound_index'):
+            self.rebuild_compound_index()
+    
+    def apply_compound_index(self, index):
+        """替换为重建好的索引"""
+        self.compound_index = index
+        if self.history_search_input.text.strip():
+            self.update_history_display()
+    
+    def refresh_if_recalculating(self):
+        """记录变化时如有未完成的重算，用最新记录重新提交"""
+        if background_pending('compound_recalc'):
+            self.recalculate_compound_total()
+    
+    def apply_compound_totals(self, records, result):
+        """应用重算结果，总额有变化时才保存"""
+        compound_total, totals = result
+        changed = compound_total != self.compound_total
+        self.compound_total = compound_total
+        # 更新记录中的总额
+        for record, (total_before, total_after) in zip(records, totals):
+            if record.get('total_before') != total_before or record.get('total_after') != total_after:
+                record['total_before'] = total_before
+                record['total_after'] = total_after
+                changed = True
+        self.update_total_display()
+        self.update_history_display()
+        if changed:
+            self.save_data()
     
     def load_data(self):
         """加载数据"""
@@ -649,11 +1330,16 @@ class CompoundScreen(Screen):
                     data = json.load(f)
                     self.compound_records = data.get('records', [])
                     self.compound_total = data.get('total', 0)
+                self.rebuild_compound_index()
                 self.update_total_display()
                 self.update_history_display()
+                # 保存的总额可能是删除后重算完成前写入的，按记录重新计算
+                self.recalculate_compound_total()
             except Exception as e:
                 print(f"加载数据失败: {e}")
                 self.compound_records = []
+                cancel_background('compound_index')
+                self.compound_index.clear()
                 self.compound_total = 0
     
     def save_data(self):
@@ -678,6 +1364,9 @@ class CalculatorApp(App):
     """主应用"""
     
     def build(self):
+        # 后台计算调度器
+        self.scheduler = ComputeScheduler()
+        
         # 设置应用存储路径
         if platform.system() == 'Android':
             from android.storage import primary_external_storage_path
@@ -707,6 +1396,10 @@ class CalculatorApp(App):
         sm.add_widget(compound_screen)
         
         return sm
+    
+    def on_stop(self):
+        """退出时关闭后台调度器"""
+        self.scheduler.shutdown()
 
 if __name__ == '__main__':
     CalculatorApp().run()